@@ -1,85 +1,300 @@
-import sys, io, json, requests, threading
-from flask import Flask, request, jsonify
+import sys, gzip, json, uuid, queue, zlib, requests, threading
+from flask import Flask, Response, request, jsonify
 from PyQt5.QtWidgets import (
     QApplication, QLabel, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QSystemTrayIcon, QMenu, QAction, QGraphicsDropShadowEffect
 )
-from PyQt5.QtGui import QPixmap, QPainterPath, QPainter, QColor, QFont, QIcon
-from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
+from PyQt5.QtGui import QPixmap, QPainterPath, QPainter, QColor, QFont, QIcon, QPen
+from PyQt5.QtCore import Qt, QObject, QTimer, QThread, QPointF, pyqtSignal
 from geopy.geocoders import Nominatim
 from datetime import datetime
-from PIL import Image
 from PIL.ImageQt import toqpixmap
+from nmea import serve_tcp, read_serial
+from shared_state import SharedFixTable, NAME, TIME_SIZE, SPEED_SIZE, fits
+from workers import serve_workers
+from geofence import GeofenceEngine, load_geojson
+from mapview import fit_view, get_base_map
+from prefetch import MapCache, AddressCache, Prefetcher
+
+try:
+    import msgpack  # optional compact encoding for /location and /devices
+except ImportError:
+    msgpack = None
 
 # --------------------- Flask Server (GPS Logger) --------------------- #
+NMEA_TCP_PORT = None       # e.g. 10110 to accept NMEA streams over TCP
+NMEA_SERIAL_DEVICE = None  # e.g. "/dev/ttyUSB0" or a pty path
+NMEA_DEVICES = {}          # NMEA source (serial path or TCP peer IP) -> device id
+WORKERS = 1                # >1 pre-forks that many server processes (POSIX only)
+DEFAULT_DEVICE = "default"
+GEOFENCE_FILE = None       # GeoJSON Polygon/MultiPolygon features, e.g. "zones.geojson"
+MAX_WAIT = 30              # longest /location?wait= long-poll, seconds
+GZIP_MIN_BYTES = 512       # a single fix is smaller gzipped than not only past this
+
 app = Flask(__name__)
-latest = {"lat": None, "lon": None, "time": None, "speed": None}
+# Latest fix per device, shared by every worker process
+fixes = SharedFixTable()
+# Part of every ETag: versions restart at 1 with the server, so a tag from an
+# earlier run must not match. Set before forking, so all workers share it.
+BOOT_ID = uuid.uuid4().hex[:8]
+# Inside/outside state and subscribers are per process; start_server refuses WORKERS > 1
+geofences = GeofenceEngine(load_geojson(GEOFENCE_FILE)) if GEOFENCE_FILE else None
 
 @app.route('/log', methods=['GET', 'POST'])
 def log_location():
     data = request.args.to_dict()
     if request.method == 'POST':
         json_body = request.get_json(silent=True) or {}
-        data.update({k: v for k, v in json_body.items() if k in ['lat', 'lon', 'longitude', 'time', 's', 'speed']})
+        data.update({k: v for k, v in json_body.items() if k in ['lat', 'lon', 'longitude', 'time', 's', 'speed', 'device']})
     
     lat = data.get('lat')
     lon = data.get('longitude') or data.get('lon')
     if not lat or not lon:
         return jsonify({"error": "missing lat/lon", "received": data}), 400
 
-    latest.update({
-        "lat": float(lat),
-        "lon": float(lon),
-        "time": data.get('time'),
-        "speed": data.get('s') or data.get('speed')
-    })
+    t, speed = data.get('time'), data.get('s') or data.get('speed')
+    device = str(data.get('device') or DEFAULT_DEVICE)
+    # the shared table has fixed-size slots; refuse what would not fit
+    if len(device.encode()) > NAME.size:
+        return jsonify({"error": f"device longer than {NAME.size} bytes"}), 400
+    if not fits(t, TIME_SIZE) or not fits(speed, SPEED_SIZE):
+        return jsonify({"error": "time or speed too long"}), 400
+
+    store_fix(float(lat), float(lon), t, speed, device)
     return jsonify({"status": "logged"}), 200
 
+def store_fix(lat, lon, time=None, speed=None, device=DEFAULT_DEVICE):
+    fixes.write(device, lat, lon, time, speed)
+    if geofences:
+        geofences.evaluate(device, lat, lon, time)
+
+def store_nmea_fix(fix, source):
+    # every receiver is its own device: as named in NMEA_DEVICES, otherwise
+    # the serial port is the default device and TCP peers go by their IP
+    device = NMEA_DEVICES.get(source) or (DEFAULT_DEVICE if source == NMEA_SERIAL_DEVICE else source)
+    store_fix(fix["lat"], fix["lon"], fix["time"], fix["speed"], device[-NAME.size:])  # IPv6 tails are unique enough
+
+def encode(payload, headers=None):
+    # msgpack when asked for (and installed), JSON otherwise; gzip larger bodies
+    headers = dict(headers or {}, Vary="Accept, Accept-Encoding")
+    if msgpack and (request.args.get('format') == 'msgpack' or 'application/msgpack' in request.headers.get('Accept', '')):
+        body, mimetype = msgpack.packb(payload), "application/msgpack"
+    else:
+        body, mimetype = json.dumps(payload).encode(), "application/json"
+    if len(body) >= GZIP_MIN_BYTES and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, mimetype=mimetype, headers=headers)
+
+def etag(version):
+    return f'W/"{BOOT_ID}-{version}"'
+
+def if_none_match_versions():
+    # If-None-Match: W/"<boot>-12", W/"<boot>-13" -> {12, 13}; other runs' tags are ignored
+    versions = set()
+    for tag in request.headers.get('If-None-Match', '').split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        boot, _, version = tag.strip('"').rpartition('-')
+        if boot == BOOT_ID and version.isdigit():
+            versions.add(int(version))
+    return versions
+
 @app.route('/location', methods=['GET'])
 def get_location():
-    return jsonify(latest) if latest["lat"] else (jsonify({"error": "no data"}), 404)
+    # ETag is the fix version: If-None-Match gets a 304 while nothing changed,
+    # and with ?wait=N the request is held until a newer fix or N seconds pass.
+    device = request.args.get('device', DEFAULT_DEVICE)
+    known = if_none_match_versions()
+    try:
+        wait = min(float(request.args.get('wait', 0)), MAX_WAIT)
+    except ValueError:
+        wait = 0
+    current = fixes.version(device)
+    if wait > 0 and (current in known or current == 0):
+        fixes.wait(device, current, wait)
+
+    fix = fixes.read(device)
+    if not fix:
+        return jsonify({"error": "no data"}), 404
+    headers = {"ETag": etag(fix["version"]), "Cache-Control": "no-cache"}
+    if fix["version"] in known:
+        return Response(status=304, headers=headers)
+    return encode(fix, headers)
+
+@app.route('/devices', methods=['GET'])
+def get_devices():
+    return encode(fixes.read_all())
+
+@app.route('/geofence/events', methods=['GET'])
+def geofence_events():
+    # Server-sent events, one `data:` line per enter/exit transition
+    if not geofences:
+        return jsonify({"error": "no geofences loaded"}), 404
+    device = request.args.get('device')
+    q = geofences.subscribe()
+
+    def stream():
+        try:
+            while True:
+                try:
+                    ev = q.get(timeout=15)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if device is None or ev["device"] == device:
+                    yield f"data: {json.dumps(ev)}\n\n"
+        finally:
+            geofences.unsubscribe(q)
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 def run_flask():
     app.run(host='0.0.0.0', port=5000, threaded=True)
 
+def start_server():
+    if WORKERS > 1 and geofences:
+        # each worker would track its own inside/outside state and subscribers,
+        # and NMEA fixes are evaluated in the parent, which serves no HTTP
+        raise RuntimeError("GEOFENCE_FILE needs WORKERS = 1")
+    if WORKERS > 1:
+        serve_workers(app, WORKERS, port=5000)
+    else:
+        threading.Thread(target=run_flask, daemon=True).start()
+
 # --------------------- PyQt Overlay --------------------- #
-def get_static_map(lat, lon):
-    url = f"https://static-maps.yandex.ru/1.x/?ll={lon},{lat}&z=14&size=200,200&l=sat,skl&pt={lon},{lat},pm2rdm"
-    try:
-        r = requests.get(url, timeout=4)
-        return Image.open(io.BytesIO(r.content)) if r.status_code == 200 else None
-    except:
-        return None
+UPDATE_INTERVAL_MS = 10000
+LONG_POLL_S = 25            # how long the overlay lets /location hold each request
+PREFETCH_BUDGET = 1_000_000  # bytes per minute the map prefetcher may download
+FLEET_MODE = False          # True: one shared map with a marker per device
+FLEET_MAP_SIZE = (400, 300)
+MARKER_COLORS = ["#e53935", "#1e88e5", "#43a047", "#fb8c00", "#8e24aa", "#00acc1"]
 
 class MapFetcher(QThread):
-    image_fetched = pyqtSignal(QPixmap)
-    def __init__(self, lat, lon):
-        super().__init__()
+    image_fetched = pyqtSignal(float, float, QPixmap)
+    def __init__(self, cache, lat, lon, parent=None):
+        super().__init__(parent)
+        self.cache = cache
         self.lat, self.lon = lat, lon
     def run(self):
-        img = get_static_map(self.lat, self.lon)
+        img = self.cache.get(self.lat, self.lon)
         if img:
             pix = toqpixmap(img.convert("RGBA")).scaled(160, 160, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.image_fetched.emit(pix)
+            self.image_fetched.emit(self.lat, self.lon, pix)
+
+class AddressFetcher(QThread):
+    address_fetched = pyqtSignal(list)
+    def __init__(self, cache, lat, lon, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.lat, self.lon = lat, lon
+    def run(self):
+        try:
+            address = self.cache.lookup(self.lat, self.lon)
+        except Exception:
+            address = ["Unknown", "", ""]
+        self.address_fetched.emit(address)
+
+class LocationPoller(QObject):
+    # Long-polls /location with the last ETag, so the server answers as soon
+    # as a new fix arrives and otherwise sends a body-less 304. Runs on a
+    # daemon thread rather than a QThread: a held long-poll can't be
+    # interrupted, and a daemon thread can simply be abandoned on exit.
+    location_fetched = pyqtSignal(dict)
+    def __init__(self, url="http://localhost:5000/location"):
+        super().__init__()
+        self.url = url
+        self.etag = None
+        self.active = threading.Event()
+        self.active.set()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+    def start(self):
+        self.thread.start()
+    def pause(self):
+        self.active.clear()  # takes effect once the request in flight returns
+    def resume(self):
+        self.etag = None  # first request after a pause returns the current fix at once
+        self.active.set()
+    def run(self):
+        session = requests.Session()
+        while not self.stopping.is_set():
+            if not self.active.wait(0.5):
+                continue
+            # per request: after resume() clears the ETag none may be sent
+            headers = {"Accept": "application/msgpack"} if msgpack else {}
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            try:
+                r = session.get(self.url, params={"wait": LONG_POLL_S}, headers=headers, timeout=LONG_POLL_S + 5)
+                if self.stopping.is_set():
+                    break
+                if r.status_code == 200:
+                    self.etag = r.headers.get("ETag")
+                    msgpacked = r.headers.get("Content-Type", "").startswith("application/msgpack")
+                    self.location_fetched.emit(msgpack.unpackb(r.content) if msgpacked else r.json())
+                elif r.status_code != 304:
+                    self.stopping.wait(1)  # no fix yet; the server already waited
+            except Exception as e:
+                if self.stopping.is_set():
+                    break  # the server going away on exit is expected
+                print("Fetch error:", e)
+                self.stopping.wait(UPDATE_INTERVAL_MS / 1000)
+    def stop(self):
+        # returns at once; a request still held by the server is abandoned
+        self.stopping.set()
+        self.active.set()
+
+class RefreshScheduler(QObject):
+    # Decides when the overlay does work. Fixes only trigger geocoding and
+    # map downloads while it is visible; while hidden the poller and the
+    # prefetcher are paused (its queue dropped), and on show it fetches the current fix once to catch up. The clock
+    # label has its own timer, aligned to the start of each minute.
+    def __init__(self, overlay, poller):
+        super().__init__(overlay)
+        self.overlay = overlay
+        self.poller = poller
+        self.visible = False
+        self.poller.pause()
+        self.overlay.prefetcher.pause()
+        self.poller.location_fetched.connect(self.on_location)
+        self.clock = QTimer(self)
+        self.clock.setSingleShot(True)
+        self.clock.timeout.connect(self.tick)
+
+    def on_location(self, data):
+        # a long-poll that was already in flight when hiding may still land
+        if self.visible:
+            self.overlay.on_location(data)
+
+    def set_visible(self, visible):
+        if visible == self.visible:
+            return
+        self.visible = visible
+        if visible:
+            self.poller.resume()
+            self.overlay.prefetcher.resume()
+            self.tick()
+        else:
+            self.poller.pause()
+            self.overlay.prefetcher.pause()
+            self.clock.stop()
 
-class GeoOverlay(QWidget):
+    def tick(self):
+        self.overlay.update_clock()
+        now = datetime.now()
+        self.clock.start(60000 - (now.second * 1000 + now.microsecond // 1000))
+
+class OverlayWindow(QWidget):
+    # Chrome shared by the overlays: frameless, always-on-top white card with
+    # a drop shadow, hide/edit buttons and a tray icon to bring it back.
     def __init__(self):
         super().__init__()
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
         self.setAttribute(Qt.WA_TranslucentBackground)
-        self.setMinimumSize(500, 200)
-        self.lat = self.lon = 0.0
-        self.cached_coords = (None, None)
-        self.address = ["Waiting...", "", ""]
-        self.geocoder = Nominatim(user_agent="geo_overlay")
-        self.initUI()
-        self.setupTray()
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.fetch_location)
-        self.timer.start(10000)
-        self.fetch_location()
 
-    def initUI(self):
+    def make_card(self, layout_cls):
         self.bg = QWidget(self)
         self.bg.setStyleSheet("background: white; border-radius: 30px;")
         shadow = QGraphicsDropShadowEffect()
@@ -87,28 +302,17 @@ class GeoOverlay(QWidget):
         shadow.setOffset(2, 2)
         shadow.setColor(QColor(0, 0, 0, 80))
         self.bg.setGraphicsEffect(shadow)
-        layout = QHBoxLayout(self.bg)
+        layout = layout_cls(self.bg)
         layout.setContentsMargins(20, 20, 20, 20)
+        return layout
 
-        self.map_label = QLabel(); self.map_label.setFixedSize(160, 160)
-        layout.addWidget(self.map_label)
-
-        self.info_layout = QVBoxLayout()
-        self.info_labels = [QLabel() for _ in range(3)]
-        for lbl in self.info_labels:
-            lbl.setFont(QFont("Segoe UI", 10)); lbl.setStyleSheet("color: #333;")
-            self.info_layout.addWidget(lbl)
-        layout.addLayout(self.info_layout)
-
-        self.btn_layout = QVBoxLayout()
+    def make_buttons(self, layout):
         self.toggle_btn = QPushButton("❌"); self.edit_btn = QPushButton("✏️")
         for btn in (self.toggle_btn, self.edit_btn):
             btn.setFixedSize(40, 40); btn.setStyleSheet("font-size: 18px;")
+            layout.addWidget(btn)
         self.toggle_btn.clicked.connect(self.hide)
         self.edit_btn.clicked.connect(self.toggle_edit)
-        self.btn_layout.addWidget(self.toggle_btn)
-        self.btn_layout.addWidget(self.edit_btn)
-        layout.addLayout(self.btn_layout)
 
     def resizeEvent(self, _): self.bg.setGeometry(0, 0, self.width(), self.height())
 
@@ -122,53 +326,226 @@ class GeoOverlay(QWidget):
         self.tray.setContextMenu(menu)
 
     def toggle_edit(self):
-        flags = self.windowFlags()
         self.setWindowFlags(Qt.Window if self.windowFlags() & Qt.FramelessWindowHint else Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
         self.show()
 
-    def fetch_location(self):
-        try:
-            r = requests.get("http://localhost:5000/location", timeout=3)
-            if r.status_code == 200:
-                data = r.json()
-                lat, lon = float(data["lat"]), float(data["lon"])
-                if (lat, lon) != (self.lat, self.lon):
-                    self.lat, self.lon = lat, lon
-                    self.update_overlay()
-        except Exception as e:
-            print("Fetch error:", e)
+class GeoOverlay(OverlayWindow):
+    def __init__(self):
+        super().__init__()
+        self.setMinimumSize(500, 200)
+        self.lat = self.lon = 0.0
+        self.address = ["Waiting...", "", ""]
+        self.maps = MapCache()
+        self.addresses = AddressCache(Nominatim(user_agent="geo_overlay"))
+        self.prefetcher = Prefetcher(self.maps, self.addresses, interval=UPDATE_INTERVAL_MS / 1000,
+                                     budget_per_min=PREFETCH_BUDGET)
+        self.initUI()
+        self.setupTray()
+        self.label_text = [None] * len(self.info_labels)
+        self.address_fetcher = None
+        self.poller = LocationPoller()
+        self.scheduler = RefreshScheduler(self, self.poller)
+        self.poller.start()
+        QApplication.instance().aboutToQuit.connect(self.poller.stop)
+        QApplication.instance().aboutToQuit.connect(self.print_prefetch_stats)
 
-    def update_overlay(self):
-        if (self.lat, self.lon) != self.cached_coords:
-            try:
-                loc = self.geocoder.reverse((self.lat, self.lon), timeout=5)
-                self.address = loc.address.split(",")[:3] if loc else ["Unknown", "", ""]
-                self.cached_coords = (self.lat, self.lon)
-            except:
-                self.address = ["Unknown", "", ""]
+    def initUI(self):
+        layout = self.make_card(QHBoxLayout)
 
-        now = datetime.now()
-        self.info_labels[0].setText(f"<b>{self.address[0]}</b><br>{self.address[1]}<br>{self.address[2]}")
-        self.info_labels[1].setText(f"<b>Lat</b> {self.lat:.6f} &nbsp;&nbsp; <b>Lon</b> {self.lon:.6f}")
-        self.info_labels[2].setText(f"<b>Date</b> {now.strftime('%d %b %Y')} &nbsp;&nbsp; <b>Time</b> {now.strftime('%I:%M %p')}")
+        self.map_label = QLabel(); self.map_label.setFixedSize(160, 160)
+        layout.addWidget(self.map_label)
 
-        self.fetcher = MapFetcher(self.lat, self.lon)
+        self.info_layout = QVBoxLayout()
+        self.info_labels = [QLabel() for _ in range(3)]
+        for lbl in self.info_labels:
+            lbl.setFont(QFont("Segoe UI", 10)); lbl.setStyleSheet("color: #333;")
+            self.info_layout.addWidget(lbl)
+        layout.addLayout(self.info_layout)
+
+        self.btn_layout = QVBoxLayout()
+        self.make_buttons(self.btn_layout)
+        layout.addLayout(self.btn_layout)
+
+    def showEvent(self, _): self.scheduler.set_visible(True)
+
+    def hideEvent(self, _): self.scheduler.set_visible(False)
+
+    def on_location(self, data):
+        lat, lon = float(data["lat"]), float(data["lon"])
+        if (lat, lon) != (self.lat, self.lon):
+            self.lat, self.lon = lat, lon
+            self.prefetcher.observe(lat, lon, data.get("speed"))
+            self.update_overlay()
+
+    def update_overlay(self):
+        self.update_address()
+        self.set_label(1, f"<b>Lat</b> {self.lat:.6f} &nbsp;&nbsp; <b>Lon</b> {self.lon:.6f}")
+
+        # parented, so replacing self.fetcher can't destroy one still waiting
+        # on a download; it deletes itself when done
+        self.fetcher = MapFetcher(self.maps, self.lat, self.lon, self)
         self.fetcher.image_fetched.connect(self.set_map)
+        self.fetcher.finished.connect(self.fetcher.deleteLater)
         self.fetcher.start()
 
-    def set_map(self, pixmap):
+    def update_address(self):
+        # one lookup at a time, off the GUI thread (geocoding is slow and rate
+        # limited); a position that changed meanwhile is looked up once it ends
+        if not self.scheduler.visible or self.address_fetcher:
+            return
+        self.address_fetcher = AddressFetcher(self.addresses, self.lat, self.lon, self)
+        self.address_fetcher.address_fetched.connect(self.set_address)
+        self.address_fetcher.finished.connect(self.address_done)
+        self.address_fetcher.finished.connect(self.address_fetcher.deleteLater)
+        self.address_fetcher.start()
+
+    def address_done(self):
+        fetcher, self.address_fetcher = self.address_fetcher, None
+        if self.addresses.key(fetcher.lat, fetcher.lon) != self.addresses.key(self.lat, self.lon):
+            self.update_address()
+
+    def set_address(self, address):
+        self.address = address
+        self.set_label(0, f"<b>{self.address[0]}</b><br>{self.address[1]}<br>{self.address[2]}")
+
+    def update_clock(self):
+        now = datetime.now()
+        self.set_label(2, f"<b>Date</b> {now.strftime('%d %b %Y')} &nbsp;&nbsp; <b>Time</b> {now.strftime('%I:%M %p')}")
+
+    def set_label(self, i, text):
+        # setText re-lays out the rich text even when nothing changed
+        if self.label_text[i] != text:
+            self.label_text[i] = text
+            self.info_labels[i].setText(text)
+
+    def set_map(self, lat, lon, pixmap):
+        if (lat, lon) != (self.lat, self.lon):
+            return  # a slower fetch for a position we have already moved on from
         masked = QPixmap(160, 160); masked.fill(Qt.transparent)
         painter = QPainter(masked)
         path = QPainterPath(); path.addEllipse(0, 0, 160, 160)
         painter.setClipPath(path); painter.drawPixmap(0, 0, pixmap); painter.end()
         self.map_label.setPixmap(masked)
 
+    def print_prefetch_stats(self):
+        s = self.maps.report()
+        print(f"Map cache: {s['hits']}/{s['requests']} hits ({s['hit_rate']:.0%}), "
+              f"prefetched {s['prefetched']} ({s['prefetch_bytes'] / 1e3:.0f} kB), "
+              f"prefetch hit rate {s['prefetch_hit_rate']:.0%}, "
+              f"wasted {(s['wasted_bytes'] + s['pending_bytes']) / 1e3:.0f} kB")
+
+class BaseMapFetcher(QThread):
+    map_fetched = pyqtSignal(object, QPixmap)
+    def __init__(self, view):
+        super().__init__()
+        self.view = view
+    def run(self):
+        img = get_base_map(self.view)
+        if img:
+            self.map_fetched.emit(self.view, toqpixmap(img.convert("RGBA")))
+
+class FleetOverlay(OverlayWindow):
+    # Every device on one base map; the map is only downloaded again when a
+    # device leaves the current view (or they all bunch up and can zoom in).
+    def __init__(self):
+        super().__init__()
+        self.positions = {}
+        self.view = None            # MapView the base image was fetched for
+        self.base = None
+        self.fetcher = None
+        self.initUI()
+        self.setupTray()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.fetch_devices)
+
+    def initUI(self):
+        w, h = FLEET_MAP_SIZE
+        self.setMinimumSize(w + 40, h + 90)
+        layout = self.make_card(QVBoxLayout)
+
+        self.map_label = QLabel(); self.map_label.setFixedSize(w, h)
+        layout.addWidget(self.map_label)
+
+        row = QHBoxLayout()
+        self.info_label = QLabel("Waiting...")
+        self.info_label.setFont(QFont("Segoe UI", 10)); self.info_label.setStyleSheet("color: #333;")
+        row.addWidget(self.info_label)
+        self.make_buttons(row)
+        layout.addLayout(row)
+
+    def showEvent(self, _):
+        # poll only while visible, catching up straight away on show
+        self.fetch_devices()
+        self.timer.start(UPDATE_INTERVAL_MS)
+
+    def hideEvent(self, _): self.timer.stop()
+
+    def fetch_devices(self):
+        try:
+            r = requests.get("http://localhost:5000/devices", timeout=3)
+            if r.status_code == 200:
+                positions = {d: (fix["lat"], fix["lon"]) for d, fix in r.json().items()}
+                if positions != self.positions:
+                    self.positions = positions
+                    self.render()
+                # every poll, so a base map that failed to download is retried
+                self.update_view()
+        except Exception as e:
+            print("Fetch error:", e)
+
+    def update_view(self):
+        points = list(self.positions.values())
+        if not points or (self.fetcher and self.fetcher.isRunning()):
+            return
+        w, h = FLEET_MAP_SIZE
+        best = fit_view(points, w, h)
+        if self.view and self.view.contains(points) and best.zoom <= self.view.zoom + 1:
+            return  # everyone is still on the current base image
+        self.fetcher = BaseMapFetcher(best)
+        self.fetcher.map_fetched.connect(self.set_base)
+        # re-check once the thread is done (isRunning() is still true while
+        # set_base runs); a failed download waits for the next poll instead
+        self.fetcher.finished.connect(self.fetch_done)
+        self.fetcher.start()
+
+    def set_base(self, view, pixmap):
+        self.view, self.base = view, pixmap
+        self.render()
+
+    def fetch_done(self):
+        if self.view is self.fetcher.view:
+            self.update_view()  # devices may have moved out while downloading
+
+    def render(self):
+        if self.base is None:
+            return
+        w, h = FLEET_MAP_SIZE
+        canvas = QPixmap(w, h); canvas.fill(Qt.transparent)
+        painter = QPainter(canvas)
+        painter.setRenderHint(QPainter.Antialiasing)
+        path = QPainterPath(); path.addRoundedRect(0, 0, w, h, 20, 20)
+        painter.setClipPath(path); painter.drawPixmap(0, 0, self.base)
+        painter.setFont(QFont("Segoe UI", 8, QFont.Bold))
+        for device, (lat, lon) in sorted(self.positions.items()):
+            x, y = self.view.pixel(lat, lon)
+            color = QColor(MARKER_COLORS[zlib.crc32(device.encode()) % len(MARKER_COLORS)])
+            painter.setPen(QPen(Qt.white, 2)); painter.setBrush(color)
+            painter.drawEllipse(QPointF(x, y), 6, 6)
+            painter.drawText(QPointF(x + 9, y + 4), device)
+        painter.end()
+        self.map_label.setPixmap(canvas)
+        self.info_label.setText(f"<b>{len(self.positions)} devices</b> &nbsp;&nbsp; <b>Zoom</b> {self.view.zoom}")
+
 # --------------------- Main --------------------- #
 if __name__ == "__main__":
-    flask_thread = threading.Thread(target=run_flask, daemon=True)
-    flask_thread.start()
+    # Fork workers before Qt or the NMEA threads exist
+    start_server()
+    if NMEA_TCP_PORT:
+        serve_tcp(NMEA_TCP_PORT, store_nmea_fix)
+    if NMEA_SERIAL_DEVICE:
+        read_serial(NMEA_SERIAL_DEVICE, store_nmea_fix)
 
     app_qt = QApplication(sys.argv)
-    geo_overlay = GeoOverlay()
+    geo_overlay = FleetOverlay() if FLEET_MODE else GeoOverlay()
     geo_overlay.show()
     sys.exit(app_qt.exec_())
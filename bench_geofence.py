@@ -0,0 +1,55 @@
+import sys, math, time, random
+from geofence import Fence, GeofenceEngine, load_geojson
+
+# Usage: python bench_geofence.py [fences.geojson]
+# Without a file, 10k random hexagonal fences (100-800 m) are generated
+# around Bengaluru and fixes are drawn from the same area.
+
+N_FENCES = 10_000
+N_FIXES = 100_000
+N_NAIVE = 2_000  # the linear scan is slow, time it on a subset
+CENTER = (12.9716, 77.5946)
+SPREAD = 0.5  # degrees
+
+
+def random_fences(n):
+    fences = []
+    for i in range(n):
+        lat = CENTER[0] + random.uniform(-SPREAD, SPREAD)
+        lon = CENTER[1] + random.uniform(-SPREAD, SPREAD)
+        r = random.uniform(0.001, 0.008)
+        ring = [(lon + r * math.cos(a * math.pi / 3), lat + r * math.sin(a * math.pi / 3)) for a in range(6)]
+        fences.append(Fence(str(i), f"zone-{i}", [[ring]]))
+    return fences
+
+
+def main():
+    fences = load_geojson(sys.argv[1]) if len(sys.argv) > 1 else random_fences(N_FENCES)
+    fixes = [(CENTER[0] + random.uniform(-SPREAD, SPREAD), CENTER[1] + random.uniform(-SPREAD, SPREAD))
+             for _ in range(N_FIXES)]
+
+    start = time.perf_counter()
+    engine = GeofenceEngine(fences)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    events = 0
+    for i, (lat, lon) in enumerate(fixes):
+        events += len(engine.evaluate(f"dev-{i % 100}", lat, lon))
+    indexed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for lat, lon in fixes[:N_NAIVE]:
+        hits = {f.id for f in fences if f.contains(lon, lat)}
+        assert hits == engine.containing(lat, lon)
+    naive = (time.perf_counter() - start) / N_NAIVE * N_FIXES
+
+    print(f"fences:      {len(fences)} (cell {engine.cell:.4f} deg, {len(engine.grid)} cells, {len(engine.large)} large)")
+    print(f"index build: {build * 1000:.0f} ms")
+    print(f"indexed:     {N_FIXES / indexed:,.0f} fixes/s ({indexed / N_FIXES * 1e6:.1f} us/fix, {events} events)")
+    print(f"naive scan:  {N_FIXES / naive:,.0f} fixes/s ({naive / N_FIXES * 1e6:.1f} us/fix)")
+    print(f"speedup:     {naive / indexed:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
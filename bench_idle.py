@@ -0,0 +1,103 @@
+import os, sys, time, multiprocessing
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+import requests
+from PIL import Image
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QEventLoop, QTimer
+import aiov2
+from prefetch import FETCH
+
+# Usage: python bench_idle.py [seconds per phase]
+# Runs the overlay against a local server fed one moving fix per second,
+# first shown and then hidden, and reports what it costs in each phase.
+# Map and geocoder calls are stubbed and counted, so nothing leaves the box.
+
+FEED_INTERVAL = 1.0
+counts = {}
+
+
+def count(name, n=1):
+    counts[name] = counts.get(name, 0) + n
+
+
+def serve_and_feed():
+    import logging, threading
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    threading.Thread(target=aiov2.run_flask, daemon=True).start()
+    time.sleep(0.5)
+    lat, lon = 12.9716, 77.5946
+    while True:
+        lat += 0.0002
+        requests.get("http://localhost:5000/log", params={"lat": lat, "lon": lon, "s": 22})
+        time.sleep(FEED_INTERVAL)
+
+
+class CountingGeocoder:
+    def reverse(self, point, timeout=None):
+        count("geocodes")
+        class Location:
+            address = f"{point[0]}, {point[1]}, Somewhere"
+        return Location()
+
+
+def fake_map(view):
+    count("map downloads")
+    img = Image.new("RGB", (FETCH, FETCH), "darkgreen")
+    img.info["download_bytes"] = 40_000
+    return img
+
+
+def instrument(overlay):
+    send = requests.Session.send
+
+    def counting_send(session, req, **kw):
+        r = send(session, req, **kw)
+        if "/location" in req.url:
+            count("/location requests")
+            count("/location bytes", len(r.content))
+        return r
+
+    requests.Session.send = counting_send
+    overlay.maps.fetch = fake_map
+    overlay.addresses.geocoder = CountingGeocoder()
+    for lbl in overlay.info_labels:
+        set_text = lbl.setText
+        lbl.setText = lambda text, set_text=set_text: (count("label writes"), set_text(text))
+
+
+def run_phase(seconds):
+    counts.clear()
+    cpu, wall = time.process_time(), time.perf_counter()
+    loop = QEventLoop()
+    QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec_()
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    return dict(counts, **{"cpu s": cpu, "cpu %": 100 * cpu / wall})
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 30
+    feeder = multiprocessing.get_context("fork").Process(target=serve_and_feed, daemon=True)
+    feeder.start()
+    time.sleep(1)
+
+    app = QApplication(sys.argv)
+    overlay = aiov2.GeoOverlay()
+    instrument(overlay)
+    overlay.show()
+    results = {"visible": run_phase(seconds)}
+    overlay.hide()
+    results["hidden"] = run_phase(seconds)
+
+    keys = ["cpu s", "cpu %", "/location requests", "/location bytes", "map downloads", "geocodes", "label writes"]
+    print(f"{seconds:.0f} s per phase, one new fix every {FEED_INTERVAL:.0f} s\n")
+    print(f"{'':<22}{'visible':>12}{'hidden':>12}")
+    for k in keys:
+        print(f"{k:<22}" + "".join(f"{results[p].get(k, 0):>12.2f}" if isinstance(results[p].get(k, 0), float)
+                                   else f"{results[p].get(k, 0):>12}" for p in results))
+    overlay.poller.stop()
+    feeder.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os, sys, time, random, tempfile
+from nmea import NMEAParser, nmea_checksum
+
+# Usage: python bench_nmea.py [recording.nmea]
+# Without a file a ~5 MB synthetic RMC/GGA recording (10 Hz) is generated.
+
+CHUNK = 4096  # read size, so sentences regularly straddle chunk boundaries
+
+
+def sentence(body):
+    return f"${body}*{nmea_checksum(body.encode()):02X}\r\n"
+
+
+def fake_recording(path, size_mb=5):
+    lat, lon = 12.9716, 77.5946
+    t = 0.0
+    written = 0
+    with open(path, "w") as f:
+        while written < size_mb * 1024 * 1024:
+            lat += random.uniform(-1e-5, 1e-5)
+            lon += random.uniform(-1e-5, 1e-5)
+            hms = time.strftime("%H%M%S", time.gmtime(t)) + f".{int(t * 10) % 10}0"
+            la = f"{int(lat):02d}{(lat % 1) * 60:07.4f}"
+            lo = f"{int(lon):03d}{(lon % 1) * 60:07.4f}"
+            chunk = (sentence(f"GPRMC,{hms},A,{la},N,{lo},E,12.5,45.0,010524,,,A")
+                     + sentence(f"GPGGA,{hms},{la},N,{lo},E,1,09,0.9,920.0,M,-86.0,M,,"))
+            f.write(chunk)
+            written += len(chunk)
+            t += 0.1
+
+
+def main():
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+        with open(path, "rb") as f:
+            data = f.read()
+    else:
+        with tempfile.NamedTemporaryFile(suffix=".nmea", delete=False) as tmp:
+            path = tmp.name
+        try:
+            fake_recording(path)
+            with open(path, "rb") as f:
+                data = f.read()
+        finally:
+            os.remove(path)
+
+    parser = NMEAParser()
+    fixes = 0
+    start = time.perf_counter()
+    for i in range(0, len(data), CHUNK):
+        fixes += len(parser.feed(data[i:i + CHUNK]))
+    elapsed = time.perf_counter() - start
+
+    print(f"file:        {path} ({len(data) / 1e6:.1f} MB)")
+    print(f"sentences:   {parser.sentences} ({parser.bad_checksums} bad checksum)")
+    print(f"fixes:       {fixes}")
+    print(f"elapsed:     {elapsed:.3f} s")
+    print(f"throughput:  {parser.sentences / elapsed:,.0f} sentences/s, {len(data) / elapsed / 1e6:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import json, queue, threading, time
+
+# --------------------- GEOFENCE ENGINE ---------------------
+#
+# Polygons are bucketed into a uniform lat/lon grid; a fix only tests the
+# fences registered in its cell, first against their bounding box and only
+# then with a ray-casting point-in-polygon test.
+
+MAX_CELLS_PER_FENCE = 256  # bigger fences skip the grid and are always bbox-checked
+
+
+class Fence:
+    def __init__(self, fence_id, name, polygons):
+        self.id = fence_id
+        self.name = name
+        self.polygons = polygons  # [[outer_ring, hole, ...], ...], rings as [(lon, lat), ...]
+        xs = [x for poly in polygons for x, _ in poly[0]]
+        ys = [y for poly in polygons for _, y in poly[0]]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+
+    def contains(self, lon, lat):
+        x0, y0, x1, y1 = self.bbox
+        if not (x0 <= lon <= x1 and y0 <= lat <= y1):
+            return False
+        for poly in self.polygons:
+            if ring_contains(poly[0], lon, lat) and not any(ring_contains(h, lon, lat) for h in poly[1:]):
+                return True
+        return False
+
+
+def ring_contains(ring, x, y):
+    inside = False
+    px, py = ring[-1]
+    for cx, cy in ring:
+        if (cy > y) != (py > y) and x < (px - cx) * (y - cy) / (py - cy) + cx:
+            inside = not inside
+        px, py = cx, cy
+    return inside
+
+
+def load_geojson(path):
+    with open(path) as f:
+        data = json.load(f)
+    features = data["features"] if data.get("type") == "FeatureCollection" else [data]
+    fences = []
+    for i, feat in enumerate(features):
+        geom = feat.get("geometry") or {}
+        props = feat.get("properties") or {}
+        if geom.get("type") == "Polygon":
+            coords = [geom["coordinates"]]
+        elif geom.get("type") == "MultiPolygon":
+            coords = geom["coordinates"]
+        else:
+            continue
+        polygons = [[[(float(p[0]), float(p[1])) for p in ring] for ring in poly] for poly in coords]
+        fence_id = str(feat.get("id", props.get("id", i)))
+        fences.append(Fence(fence_id, props.get("name", fence_id), polygons))
+    return fences
+
+
+class GeofenceEngine:
+    def __init__(self, fences, cell_size=None):
+        self.fences = fences
+        self.names = {f.id: f.name for f in fences}
+        self.cell = cell_size or self.auto_cell_size(fences)
+        self.grid = {}
+        self.large = []
+        for fence in fences:
+            x0, y0, x1, y1 = fence.bbox
+            cx0, cy0 = self.cell_of(x0, y0)
+            cx1, cy1 = self.cell_of(x1, y1)
+            if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > MAX_CELLS_PER_FENCE:
+                self.large.append(fence)
+                continue
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self.grid.setdefault((cx, cy), []).append(fence)
+
+        self.inside = {}  # device -> frozenset of fence ids
+        self.lock = threading.Lock()
+        self.subscribers = []
+
+    @staticmethod
+    def auto_cell_size(fences):
+        # about twice the median fence extent: most fences land in 1-4 cells
+        if not fences:
+            return 1.0
+        spans = sorted(max(f.bbox[2] - f.bbox[0], f.bbox[3] - f.bbox[1]) for f in fences)
+        return max(spans[len(spans) // 2] * 2, 1e-4)
+
+    def cell_of(self, lon, lat):
+        return int(lon // self.cell), int(lat // self.cell)
+
+    def containing(self, lat, lon):
+        candidates = self.grid.get(self.cell_of(lon, lat), ())
+        hits = {f.id for f in candidates if f.contains(lon, lat)}
+        hits.update(f.id for f in self.large if f.contains(lon, lat))
+        return frozenset(hits)
+
+    def evaluate(self, device, lat, lon, t=None):
+        """Update the device's inside/outside state and publish enter/exit events."""
+        now_inside = self.containing(lat, lon)
+        # swap and publish under one lock, so concurrent fixes for the same
+        # device reach subscribers in the order their transitions happened
+        with self.lock:
+            before = self.inside.get(device, frozenset())
+            self.inside[device] = now_inside
+            if now_inside == before:
+                return []
+            events = [self.event(device, fid, "enter", lat, lon, t) for fid in now_inside - before]
+            events += [self.event(device, fid, "exit", lat, lon, t) for fid in before - now_inside]
+            self.publish(events)
+        return events
+
+    def event(self, device, fence_id, kind, lat, lon, t):
+        return {"device": device, "fence": fence_id, "name": self.names[fence_id], "event": kind,
+                "lat": lat, "lon": lon, "time": t, "ts": time.time()}
+
+    # --- subscriptions (one queue per /geofence/events client) ---
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=1000)
+        with self.lock:
+            self.subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            if q in self.subscribers:
+                self.subscribers.remove(q)
+
+    def publish(self, events):
+        # called with self.lock held; put_nowait never blocks
+        for q in self.subscribers:
+            for ev in events:
+                try:
+                    q.put_nowait(ev)
+                except queue.Full:
+                    pass  # slow client, drop rather than stall ingest
@@ -0,0 +1,81 @@
+import io, math, requests
+from PIL import Image
+
+# --------------------- STATIC MAP VIEW ---------------------
+#
+# Pixel maths for the Yandex static map tiles, so markers can be drawn
+# locally on a single base image. Yandex uses the elliptical Mercator
+# projection (EPSG:3395), not the spherical one used by OSM/Google.
+
+TILE = 256
+E = 0.0818191908426  # WGS84 eccentricity
+MAX_ZOOM = 15  # deepest zoom fit_view picks, even for a single point
+
+
+def world_pixel(lat, lon, zoom):
+    size = TILE * 2 ** zoom
+    phi = math.radians(max(min(lat, 85.0), -85.0))
+    esin = E * math.sin(phi)
+    m = math.log(math.tan(math.pi / 4 + phi / 2) * ((1 - esin) / (1 + esin)) ** (E / 2))
+    return (lon + 180.0) / 360.0 * size, (1 - m / math.pi) / 2 * size
+
+
+def world_latlon(x, y, zoom):
+    # inverse of world_pixel; the ellipsoid term needs a few fixed-point steps
+    size = TILE * 2 ** zoom
+    lon = x / size * 360.0 - 180.0
+    t = math.exp(-(2 * y / size - 1) * math.pi)
+    phi = math.pi / 2 - 2 * math.atan(1 / t)
+    for _ in range(6):
+        esin = E * math.sin(phi)
+        phi = math.pi / 2 - 2 * math.atan(1 / t * ((1 - esin) / (1 + esin)) ** (E / 2))
+    return math.degrees(phi), lon
+
+
+class MapView:
+    def __init__(self, lat, lon, zoom, width, height):
+        self.lat, self.lon, self.zoom = lat, lon, zoom
+        self.width, self.height = width, height
+        self.cx, self.cy = world_pixel(lat, lon, zoom)
+
+    def pixel(self, lat, lon):
+        x, y = world_pixel(lat, lon, self.zoom)
+        return x - self.cx + self.width / 2, y - self.cy + self.height / 2
+
+    def contains(self, points, margin=0.1):
+        # margin is the fraction of each edge kept free so markers are not clipped
+        mx, my = self.width * margin, self.height * margin
+        for lat, lon in points:
+            x, y = self.pixel(lat, lon)
+            if not (mx <= x <= self.width - mx and my <= y <= self.height - my):
+                return False
+        return True
+
+    def url(self):
+        return (f"https://static-maps.yandex.ru/1.x/?ll={self.lon},{self.lat}&z={self.zoom}"
+                f"&size={self.width},{self.height}&l=sat,skl")
+
+
+def fit_view(points, width, height, margin=0.1, max_zoom=MAX_ZOOM):
+    """Deepest zoom whose view centred on the points' bounding box holds them all."""
+    lats = [p[0] for p in points]
+    lons = [p[1] for p in points]
+    lat, lon = (min(lats) + max(lats)) / 2, (min(lons) + max(lons)) / 2
+    for zoom in range(max_zoom, -1, -1):
+        view = MapView(lat, lon, zoom, width, height)
+        if view.contains(points, margin):
+            return view
+    return MapView(lat, lon, 0, width, height)
+
+
+def get_base_map(view):
+    # Same source as get_static_map, but without the server-side marker
+    try:
+        r = requests.get(view.url(), timeout=4)
+        if r.status_code != 200:
+            return None
+        img = Image.open(io.BytesIO(r.content))
+        img.info["download_bytes"] = len(r.content)
+        return img
+    except Exception:
+        return None
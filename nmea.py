@@ -0,0 +1,221 @@
+import os, socket, threading
+
+try:
+    import serial  # pyserial, only needed for real serial ports
+except ImportError:
+    serial = None
+
+# --------------------- NMEA PARSER ---------------------
+
+KNOTS_TO_MS = 0.514444
+MAX_LINE = 512  # NMEA caps sentences at 82 chars; anything longer is line noise
+
+
+def nmea_checksum(body):
+    # XOR of every byte between '$' and '*', folded as one big integer
+    # instead of looping over the bytes in Python.
+    x = int.from_bytes(body, "big")
+    width = len(body)
+    while width > 1:
+        half = width // 2
+        x = (x >> (8 * half)) ^ (x & ((1 << (8 * half)) - 1))
+        width -= half
+    return x
+
+
+def parse_coord(value, hemisphere):
+    # ddmm.mmmm / dddmm.mmmm -> decimal degrees
+    if not value:
+        return None
+    v = float(value)
+    deg = int(v // 100)
+    coord = deg + (v - deg * 100) / 60.0
+    return -coord if hemisphere in (b"S", b"W") else coord
+
+
+class NMEAParser:
+    """Incremental $--RMC / $--GGA parser.
+
+    feed() accepts arbitrary chunks (partial sentences are kept until the
+    rest arrives) and returns the fixes completed by that chunk as dicts
+    shaped like the ones log_location stores. Receivers send RMC and GGA
+    for the same epoch and one fix is emitted per epoch (by the hhmmss
+    field). RMC is preferred since it carries date and speed: an RMC fix
+    goes out at once, while a GGA fix is held until the next sentence
+    shows whether its epoch's RMC follows. Receivers that send only GGA
+    therefore lag by one epoch, and such fixes have no speed (their date,
+    if any, is the last RMC's).
+    """
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.date = None   # last RMC date, GGA carries time only
+        self.speed = None  # last RMC speed in m/s, as a string like the HTTP path
+        self.epoch = None    # hhmmss of the last emitted fix
+        self.pending = None  # GGA fix waiting for the RMC of its epoch
+        self.sentences = 0
+        self.bad_checksums = 0
+
+    def feed(self, data):
+        buf = self.buf
+        buf += data
+        fixes = []
+        start = 0
+        while True:
+            end = buf.find(b"\n", start)
+            if end < 0:
+                break
+            fix = self.parse_sentence(bytes(buf[start:end]))
+            if fix:
+                fixes.append(fix)
+            start = end + 1
+        if start:
+            del buf[:start]
+        if len(buf) > MAX_LINE:
+            del buf[:]
+        return fixes
+
+    def parse_sentence(self, line):
+        line = line.strip()
+        dollar = line.find(b"$")
+        if dollar < 0:
+            return None
+        star = line.rfind(b"*")
+        if star < 0 or len(line) < star + 3:
+            return None
+        body = line[dollar + 1:star]
+        self.sentences += 1
+        try:
+            expected = int(line[star + 1:star + 3], 16)
+        except ValueError:
+            expected = -1
+        if nmea_checksum(body) != expected:
+            self.bad_checksums += 1
+            return None
+
+        kind = body[2:5]
+        try:
+            if kind == b"RMC":
+                return self.parse_rmc(body.split(b","))
+            if kind == b"GGA":
+                return self.parse_gga(body.split(b","))
+        except (ValueError, IndexError):
+            return None
+        return None
+
+    def parse_rmc(self, f):
+        # RMC,hhmmss.ss,A,llll.ll,a,yyyyy.yy,a,knots,course,ddmmyy,...
+        if f[2] != b"A":
+            return None
+        if f[1] and f[1] == self.epoch:
+            return None
+        if f[9]:
+            self.date = f[9]
+        self.speed = f"{float(f[7]) * KNOTS_TO_MS:.2f}" if f[7] else None
+        fix = self.make_fix(f[1], parse_coord(f[3], f[4]), parse_coord(f[5], f[6]), self.speed)
+        if fix:
+            # supersedes a held GGA of this epoch (or of one whose RMC was lost)
+            self.epoch, self.pending = f[1], None
+        return fix
+
+    def parse_gga(self, f):
+        # GGA,hhmmss.ss,llll.ll,a,yyyyy.yy,a,quality,...
+        if not f[6] or f[6] == b"0" or (f[1] and f[1] == self.epoch):
+            return None
+        # GGA carries no date or speed; hold it until we know whether an RMC
+        # for the same epoch follows, and release the previous one if not
+        held, self.pending = self.pending, (f[1], parse_coord(f[2], f[3]), parse_coord(f[4], f[5]))
+        return self.release(held)
+
+    def release(self, held):
+        if held is None or (held[0] and held[0] == self.pending[0]):
+            return None
+        hms, lat, lon = held
+        fix = self.make_fix(hms, lat, lon, None)  # the last RMC speed is from another epoch
+        if fix:
+            self.epoch = hms
+        return fix
+
+    def make_fix(self, hms, lat, lon, speed):
+        if lat is None or lon is None:
+            return None
+        return {"lat": lat, "lon": lon, "time": self.format_time(hms), "speed": speed}
+
+    def format_time(self, hms):
+        if not hms:
+            return None
+        t = hms.decode("ascii")
+        clock = f"{t[0:2]}:{t[2:4]}:{t[4:]}"
+        if self.date:
+            d = self.date.decode("ascii")
+            century = "19" if d[4:6] >= "80" else "20"
+            return f"{century}{d[4:6]}-{d[2:4]}-{d[0:2]}T{clock}Z"
+        return clock
+
+# --------------------- LISTENERS ---------------------
+
+def pump(read, on_fix, chunk=4096):
+    parser = NMEAParser()
+    while True:
+        data = read(chunk)
+        if not data:
+            break
+        for fix in parser.feed(data):
+            on_fix(fix)
+
+
+def serve_tcp(port, on_fix, host="0.0.0.0"):
+    """Accept NMEA streams over TCP, one parser per connection.
+
+    on_fix(fix, source) gets the peer's IP address as the source.
+    """
+    srv = socket.create_server((host, port))
+
+    def handle(conn, addr):
+        with conn:
+            try:
+                pump(conn.recv, lambda fix: on_fix(fix, addr[0]))
+            except OSError as e:
+                print("NMEA TCP error", addr, e)
+
+    def accept_loop():
+        while True:
+            conn, addr = srv.accept()
+            threading.Thread(target=handle, args=(conn, addr), daemon=True).start()
+
+    t = threading.Thread(target=accept_loop, daemon=True)
+    t.start()
+    print(f"📡 NMEA TCP listening on {host}:{port}")
+    return t
+
+
+def read_serial(device, on_fix, baudrate=9600):
+    """Read NMEA from a serial device (pyserial) or a pty / FIFO path.
+
+    on_fix(fix, source) gets the device path as the source.
+    """
+    def emit(fix):
+        on_fix(fix, device)
+
+    def loop():
+        try:
+            if serial is not None:
+                with serial.Serial(device, baudrate, timeout=1) as port:
+                    # pyserial returns b"" on timeout, keep reading until closed
+                    parser = NMEAParser()
+                    while port.is_open:
+                        for fix in parser.feed(port.read(port.in_waiting or 1)):
+                            emit(fix)
+            else:
+                fd = os.open(device, os.O_RDONLY | getattr(os, "O_NOCTTY", 0))
+                try:
+                    pump(lambda n: os.read(fd, n), emit)
+                finally:
+                    os.close(fd)
+        except (OSError, ValueError) as e:
+            print("NMEA serial error", device, e)
+
+    t = threading.Thread(target=loop, daemon=True)
+    t.start()
+    print(f"📡 NMEA serial reading {device}")
+    return t
@@ -0,0 +1,267 @@
+import math, time, threading
+from collections import OrderedDict, deque
+from PIL import ImageDraw
+from mapview import MapView, world_pixel, world_latlon, get_base_map
+
+# --------------------- MAP / ADDRESS CACHE + PREFETCH ---------------------
+#
+# Maps are fetched centred on a fixed pixel grid (GRID px apart) and
+# slightly larger than what the overlay shows, so one cached image can
+# serve every position within half a grid step of its centre: the overlay
+# crops around the device and draws the marker itself. That is what makes
+# a map fetched for a *predicted* position reusable for the real one.
+
+ZOOM = 14
+VIEW = 200                 # what the overlay shows, as before
+GRID = 100
+FETCH = VIEW + GRID        # fetched image edge
+ADDRESS_PRECISION = 3      # ~110 m cells for reverse geocoding
+GEOCODE_INTERVAL = 1.0     # Nominatim's usage policy: at most one request per second
+EARTH_R = 6371000.0
+
+
+class MapCache:
+    def __init__(self, capacity=64, fetch=get_base_map):
+        self.capacity = capacity
+        self.fetch = fetch
+        self.entries = OrderedDict()  # key -> [view, image, nbytes, prefetched, used]
+        self.inflight = {}            # key -> Event, so a miss waits for a running prefetch
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "hits": 0, "prefetch_hits": 0, "prefetched": 0,
+                      "prefetch_bytes": 0, "wasted_bytes": 0}
+
+    @staticmethod
+    def key(lat, lon):
+        x, y = world_pixel(lat, lon, ZOOM)
+        return round(x / GRID), round(y / GRID)
+
+    def contains(self, key):
+        with self.lock:
+            return key in self.entries or key in self.inflight
+
+    def load(self, key, prefetch=False):
+        with self.lock:
+            if key in self.entries:
+                return self.entries[key]
+            event = self.inflight.get(key)
+            if event is None:
+                event = self.inflight[key] = threading.Event()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            event.wait(10)
+            with self.lock:
+                return self.entries.get(key)
+
+        try:
+            lat, lon = world_latlon(key[0] * GRID, key[1] * GRID, ZOOM)
+            view = MapView(lat, lon, ZOOM, FETCH, FETCH)
+            img = self.fetch(view)
+            if img is None:
+                return None
+            entry = [view, img.convert("RGB"), img.info.get("download_bytes", 0), prefetch, False]
+            with self.lock:
+                self.entries[key] = entry
+                if prefetch:
+                    self.stats["prefetched"] += 1
+                    self.stats["prefetch_bytes"] += entry[2]
+                while len(self.entries) > self.capacity:
+                    _, old = self.entries.popitem(last=False)
+                    if old[3] and not old[4]:
+                        self.stats["wasted_bytes"] += old[2]
+            return entry
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            event.set()
+
+    def get(self, lat, lon):
+        """VIEW x VIEW image centred on (lat, lon) with the marker drawn, or None."""
+        key = self.key(lat, lon)
+        with self.lock:
+            self.stats["requests"] += 1
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                if entry[3] and not entry[4]:
+                    self.stats["prefetch_hits"] += 1
+                entry[4] = True
+        if entry is None:
+            entry = self.load(key)
+            if entry is None:
+                return None
+            with self.lock:
+                if entry[3] and not entry[4]:
+                    self.stats["prefetch_hits"] += 1  # arrived while we waited on it
+                entry[4] = True
+        view, img = entry[0], entry[1]
+        x, y = view.pixel(lat, lon)
+        left, top = round(x - VIEW / 2), round(y - VIEW / 2)
+        out = img.crop((left, top, left + VIEW, top + VIEW))
+        draw = ImageDraw.Draw(out)
+        c = VIEW / 2
+        draw.ellipse((c - 7, c - 7, c + 7, c + 7), fill="#e53935", outline="white", width=2)
+        return out
+
+    def report(self):
+        with self.lock:
+            s = dict(self.stats)
+            s["pending_bytes"] = sum(e[2] for e in self.entries.values() if e[3] and not e[4])
+        s["hit_rate"] = s["hits"] / s["requests"] if s["requests"] else 0.0
+        s["prefetch_hit_rate"] = s["prefetch_hits"] / s["prefetched"] if s["prefetched"] else 0.0
+        return s
+
+
+class AddressCache:
+    def __init__(self, geocoder, capacity=256):
+        self.geocoder = geocoder
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.next_request = 0.0  # monotonic time the next geocoder request may go out
+
+    @staticmethod
+    def key(lat, lon):
+        return round(lat, ADDRESS_PRECISION), round(lon, ADDRESS_PRECISION)
+
+    def reserve(self, block=True):
+        # claims the next free geocoder slot; blocking callers sleep outside
+        # the lock so lookups go out in reservation order, GEOCODE_INTERVAL apart
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_request - now
+            if wait > 0 and not block:
+                return False
+            self.next_request = max(now, self.next_request) + GEOCODE_INTERVAL
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def contains(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def lookup(self, lat, lon, block=True):
+        """[line1, line2, line3] for the position; without `block`, None when
+        the geocoder was used less than GEOCODE_INTERVAL ago."""
+        key = self.key(lat, lon)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        if not self.reserve(block):
+            return None
+        loc = self.geocoder.reverse(key, timeout=5)
+        address = loc.address.split(",")[:3] if loc else ["Unknown", "", ""]
+        address += [""] * (3 - len(address))
+        with self.lock:
+            self.entries[key] = address
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        return address
+
+
+def destination(lat, lon, bearing, distance):
+    # short hops only, a flat-earth step is plenty
+    dlat = distance * math.cos(bearing) / EARTH_R
+    dlon = distance * math.sin(bearing) / (EARTH_R * math.cos(math.radians(lat)))
+    return lat + math.degrees(dlat), lon + math.degrees(dlon)
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Prefetcher:
+    """Warms the caches for where the device will be in the next few refreshes.
+
+    Heading comes from the last two fixes, speed from the fix's `speed`
+    field (m/s) or, without one, from the distance between the fixes.
+    Downloads run on one background thread and stop once the per-minute
+    byte budget is spent; the budget refills continuously. Address lookups
+    share the geocoder's one-per-second limit with the overlay and are
+    skipped rather than queued when it is busy.
+    """
+
+    def __init__(self, maps, addresses, interval=10.0, horizon=3, budget_per_min=1_000_000):
+        self.maps = maps
+        self.addresses = addresses
+        self.interval = interval
+        self.horizon = horizon
+        self.rate = budget_per_min / 60.0
+        self.tokens = float(budget_per_min)
+        self.capacity = float(budget_per_min)
+        self.last_refill = time.monotonic()
+        self.avg_bytes = 40_000.0
+        self.last = None
+        self.queue = deque(maxlen=2 * horizon)
+        self.paused = False
+        self.wake = threading.Condition()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def observe(self, lat, lon, speed=None):
+        now = time.monotonic()
+        prev, self.last = self.last, (lat, lon, now)
+        if prev is None:
+            return
+        plat, plon, pt = prev
+        dy = math.radians(lat - plat) * EARTH_R
+        dx = math.radians(lon - plon) * EARTH_R * math.cos(math.radians(lat))
+        moved = math.hypot(dx, dy)
+        if moved < 1.0:
+            return
+        speed = to_float(speed)
+        if speed is None:
+            speed = moved / max(now - pt, 1e-3)
+        bearing = math.atan2(dx, dy)
+        targets = [destination(lat, lon, bearing, speed * self.interval * k) for k in range(1, self.horizon + 1)]
+        with self.wake:
+            self.queue.clear()  # stale predictions are worthless once the device turns
+            self.queue.extend(targets)
+            self.wake.notify()
+
+    def pause(self):
+        # while the overlay is hidden; a download already running still finishes
+        with self.wake:
+            self.paused = True
+            self.queue.clear()
+
+    def resume(self):
+        with self.wake:
+            self.paused = False
+            self.wake.notify()
+
+    def spend(self, nbytes):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+        if self.tokens < nbytes:
+            return False
+        self.tokens -= nbytes
+        return True
+
+    def run(self):
+        while True:
+            with self.wake:
+                while not self.queue or self.paused:
+                    self.wake.wait()
+                lat, lon = self.queue.popleft()
+            key = self.maps.key(lat, lon)
+            if not self.maps.contains(key):
+                if not self.spend(self.avg_bytes):
+                    continue
+                entry = self.maps.load(key, prefetch=True)
+                if entry:
+                    self.avg_bytes = 0.8 * self.avg_bytes + 0.2 * entry[2]
+            if self.paused:
+                continue  # hidden while the map downloaded
+            if not self.addresses.contains(self.addresses.key(lat, lon)):
+                try:
+                    self.addresses.lookup(lat, lon, block=False)
+                except Exception as e:
+                    print("Prefetch geocode error:", e)
@@ -0,0 +1,254 @@
+import sys, csv, json, math, time, heapq, random, argparse, threading
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+# --------------------- TRACK REPLAY / LOAD GENERATOR ---------------------
+#
+#   python replay.py track.gpx --speed 10
+#   python replay.py track.csv --devices 2000 --concurrency 64 --json report.json
+#   python replay.py track.ndjson --overlay
+#
+# Every fix is sent to /log with a unique `time` stamp ("<seq>:<send time>").
+# The harness then measures how long /log took to accept it, how long until
+# /location returns that stamp and (with --overlay, default device only)
+# until an in-process GeoOverlay shows the position in its labels. All of
+# them count from when the fix was due, not from when a sender got to it,
+# so time spent queued behind a slow server is part of the latency.
+
+
+def parse_time(value):
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            yield row.get("lat"), row.get("lon") or row.get("longitude"), row.get("time"), row.get("speed") or row.get("s")
+
+
+def read_ndjson(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                d = json.loads(line)
+                yield d.get("lat"), d.get("lon") or d.get("longitude"), d.get("time"), d.get("speed") or d.get("s")
+
+
+def read_gpx(path):
+    for _, el in ET.iterparse(path):
+        if el.tag.rsplit("}", 1)[-1] != "trkpt":
+            continue
+        fields = {child.tag.rsplit("}", 1)[-1]: child.text for child in el.iter()}
+        yield el.get("lat"), el.get("lon"), fields.get("time"), fields.get("speed")
+        el.clear()
+
+
+def load_track(path, interval):
+    ext = path.rsplit(".", 1)[-1].lower()
+    reader = {"csv": read_csv, "gpx": read_gpx}.get(ext, read_ndjson)
+    track = []
+    for lat, lon, t, speed in reader(path):
+        if lat in (None, "") or lon in (None, ""):
+            continue
+        track.append({"lat": float(lat), "lon": float(lon), "t": parse_time(t), "speed": speed})
+    if not track:
+        sys.exit(f"no fixes in {path}")
+    # offsets from the first fix; tracks without usable timestamps get a fixed interval
+    t0 = track[0]["t"]
+    for i, fix in enumerate(track):
+        fix["offset"] = fix["t"] - t0 if t0 is not None and fix["t"] is not None else i * interval
+    return track
+
+
+def stamp_seq(value):
+    # the server may still hold a fix from another client or an earlier run
+    try:
+        return int(str(value).split(":", 1)[0])
+    except ValueError:
+        return None
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+class Replay:
+    def __init__(self, args):
+        self.args = args
+        self.url = args.url.rstrip("/")
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.latency = {"log": [], "visible": [], "overlay": []}
+        self.sent = self.errors = self.late = 0
+        self.due_at = {}  # (lat, lon) -> due time, default device only (--overlay)
+
+    def session(self):
+        if not hasattr(self.local, "s"):
+            self.local.s = requests.Session()
+        return self.local.s
+
+    def device_stream(self, track, d):
+        # synthetic devices get a small position offset and a start stagger
+        # so they do not fire in lockstep
+        device = "default" if d == 0 and self.args.overlay else f"replay-{d}"
+        dlat, dlon = (0.0, 0.0) if d == 0 else (random.uniform(-0.05, 0.05), random.uniform(-0.05, 0.05))
+        stagger = 0.0 if d == 0 else random.uniform(0, self.args.interval)
+        for fix in track:
+            yield fix["offset"] + stagger, device, fix["lat"] + dlat, fix["lon"] + dlon, fix["speed"]
+
+    def schedule(self, track):
+        # one time-ordered stream, merged lazily from the per-device streams
+        period = max(track[-1]["offset"], self.args.interval)
+        streams = [self.device_stream(track, d) for d in range(self.args.devices)]
+        return heapq.merge(*streams, key=lambda p: p[0]), period
+
+    def send(self, seq, device, lat, lon, speed, due, due_wall):
+        s = self.session()
+        stamp = f"{seq}:{due_wall:.6f}"
+        if time.perf_counter() - due > 0.1:
+            with self.lock:
+                self.late += 1  # waited for a free sender
+        try:
+            r = s.post(f"{self.url}/log", json={"lat": lat, "lon": lon, "time": stamp, "speed": speed, "device": device}, timeout=10)
+            accepted = time.perf_counter()
+            if r.status_code != 200:
+                raise RuntimeError(f"/log returned {r.status_code}")
+        except Exception:
+            with self.lock:
+                self.errors += 1
+            return
+        with self.lock:
+            self.sent += 1
+            self.latency["log"].append(accepted - due)
+            if device == "default" and self.args.overlay:
+                self.due_at[(lat, lon)] = due
+
+        if seq % self.args.probe_every:
+            return
+        deadline = accepted + 5
+        while time.perf_counter() < deadline:
+            try:
+                got = s.get(f"{self.url}/location", params={"device": device}, timeout=5).json().get("time")
+            except Exception:
+                got = None
+            # a newer fix for the same device also proves ours was visible
+            got = stamp_seq(got) if got else None
+            if got is not None and got >= seq:
+                with self.lock:
+                    self.latency["visible"].append(time.perf_counter() - due)
+                return
+            time.sleep(0.001)
+
+    def run(self, track):
+        plan, period = self.schedule(track)
+        print(f"▶ {len(track) * self.args.devices} fixes, {self.args.devices} device(s), "
+              f"{period:.0f} s of track at {self.args.speed}x")
+        start, start_wall = time.perf_counter(), time.time()
+        with ThreadPoolExecutor(self.args.concurrency) as pool:
+            for seq, (offset, device, lat, lon, speed) in enumerate(plan):
+                due = start + offset / self.args.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.send, seq, device, lat, lon, speed, due, start_wall + (due - start))
+        self.elapsed = time.perf_counter() - start
+
+    def overlay_seen(self, lat, lon):
+        when = time.perf_counter()
+        with self.lock:
+            due = self.due_at.pop((lat, lon), None)
+            if due is not None:
+                self.latency["overlay"].append(when - due)
+
+    def report(self):
+        rows = {}
+        for name, values in self.latency.items():
+            if values:
+                rows[name] = {"count": len(values), "mean_ms": sum(values) / len(values) * 1000,
+                              **{f"p{p}_ms": percentile(values, p) * 1000 for p in (50, 90, 99)},
+                              "max_ms": max(values) * 1000}
+        return {"fixes_sent": self.sent, "errors": self.errors, "late_sends": self.late,
+                "elapsed_s": self.elapsed, "throughput_fps": self.sent / self.elapsed if self.elapsed else 0.0,
+                "latency": rows}
+
+
+def print_table(report):
+    print(f"\nsent {report['fixes_sent']} fixes in {report['elapsed_s']:.1f} s "
+          f"→ {report['throughput_fps']:.1f} fixes/s ({report['errors']} errors, {report['late_sends']} sent >100 ms late)\n")
+    labels = {"log": "due → /log accept", "visible": "due → /location", "overlay": "due → overlay label"}
+    print(f"{'stage':<24}{'count':>8}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}   (ms)")
+    for name, row in report["latency"].items():
+        print(f"{labels[name]:<24}{row['count']:>8}" + "".join(
+            f"{row[k]:>10.1f}" for k in ("mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms")))
+
+
+def run_with_overlay(replay, track):
+    # The overlay long-polls /location for the default device, so each fix
+    # reaches it as soon as it is stored; the replay runs on a thread while
+    # Qt owns the main thread.
+    import aiov2
+    from PyQt5.QtWidgets import QApplication
+
+    class MeasuredOverlay(aiov2.GeoOverlay):
+        def update_overlay(self):
+            super().update_overlay()
+            replay.overlay_seen(self.lat, self.lon)
+
+    app = QApplication(sys.argv)
+    overlay = MeasuredOverlay()
+    overlay.show()
+
+    def drive():
+        replay.run(track)
+        time.sleep(2)  # let the last fix reach the overlay
+        app.quit()
+
+    threading.Thread(target=drive, daemon=True).start()
+    app.exec_()
+
+
+def main():
+    p = argparse.ArgumentParser(description="Replay a recorded track into /log and measure end-to-end latency.")
+    p.add_argument("track", help="CSV (lat,lon,time,speed), GPX or NDJSON file")
+    p.add_argument("--url", default="http://localhost:5000")
+    p.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier (default real time)")
+    p.add_argument("--devices", type=int, default=1, help="synthetic devices replaying the same track")
+    p.add_argument("--interval", type=float, default=1.0, help="seconds between fixes when the track has no times")
+    p.add_argument("--concurrency", type=int, default=16, help="parallel HTTP senders")
+    p.add_argument("--probe-every", type=int, default=1, help="check /location visibility for every Nth fix")
+    p.add_argument("--overlay", action="store_true", help="also time the overlay label update (device 0 = default)")
+    p.add_argument("--json", help="write the report as JSON to this path ('-' for stdout)")
+    args = p.parse_args()
+
+    track = load_track(args.track, args.interval)
+    replay = Replay(args)
+    if args.overlay:
+        run_with_overlay(replay, track)
+    else:
+        replay.run(track)
+
+    report = replay.report()
+    print_table(report)
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import json, mmap, struct, time, threading, multiprocessing
+from contextlib import contextmanager
+
+# --------------------- SHARED LATEST-FIX TABLE ---------------------
+#
+# One fixed-size slot per device in an anonymous shared mapping. Created
+# before the workers are forked, so every process maps the same pages.
+# Writers serialise on a process-shared lock; readers never lock and use
+# the per-slot sequence counter (seqlock): odd while a write is in
+# progress, and re-read after copying the slot to detect a torn read.
+# seq // 2 is the number of completed writes, i.e. the fix's version.
+# A writer that dies mid-update leaves its slot odd; the next write to
+# that slot completes it, and readers give up after READ_TIMEOUT.
+
+HEADER = struct.Struct("<Q")                    # number of allocated slots
+SEQ = struct.Struct("<Q")
+NAME = struct.Struct("<32s")
+TIME_SIZE, SPEED_SIZE = 48, 24
+PAYLOAD = struct.Struct(f"<dd{TIME_SIZE}s{SPEED_SIZE}s")  # lat, lon, time (json), speed (json)
+SLOT_SIZE = SEQ.size + NAME.size + PAYLOAD.size
+NAME_OFF = SEQ.size
+PAYLOAD_OFF = SEQ.size + NAME.size
+READ_TIMEOUT = 1.0                              # seconds a reader waits on an odd slot
+LOCK_TIMEOUT = 5.0
+
+
+def pack_json(value, size):
+    # time/speed arrive as whatever the client sent (string, number, None);
+    # storing them as JSON keeps /location output identical to the dict store.
+    raw = json.dumps(value).encode()
+    if len(raw) <= size:
+        return raw
+    # too long: keep a prefix of the text, then trim off what escaping added
+    value = str(value)[:size]
+    raw = json.dumps(value).encode()
+    while len(raw) > size:
+        value = value[:len(value) - max(1, (len(raw) - size) // 6)]
+        raw = json.dumps(value).encode()
+    return raw
+
+
+def fits(value, size):
+    return len(json.dumps(value).encode()) <= size
+
+
+class SharedFixTable:
+    def __init__(self, slots=4096):
+        self.slots = slots
+        self.mem = mmap.mmap(-1, HEADER.size + slots * SLOT_SIZE)
+        self.lock = multiprocessing.Lock()
+        self.index = {}  # device -> slot, per process; slots never move once assigned
+        self.changed = threading.Condition()  # wakes long-polls in this process
+
+    def offset(self, slot):
+        return HEADER.size + slot * SLOT_SIZE
+
+    def refresh_index(self):
+        count = HEADER.unpack_from(self.mem, 0)[0]
+        for slot in range(len(self.index), count):
+            name = NAME.unpack_from(self.mem, self.offset(slot) + NAME_OFF)[0]
+            self.index[name.rstrip(b"\0").decode()] = slot
+
+    def find(self, device, create=False):
+        if len(device.encode()) > NAME.size:
+            # never stored; truncating would let two names share a slot
+            if create:
+                raise ValueError(f"device name longer than {NAME.size} bytes")
+            return None
+        slot = self.index.get(device)
+        if slot is None:
+            self.refresh_index()
+            slot = self.index.get(device)
+        if slot is None and create:
+            with self.locked():
+                self.refresh_index()
+                slot = self.index.get(device)
+                if slot is None:
+                    slot = len(self.index)
+                    if slot >= self.slots:
+                        raise RuntimeError("shared fix table full")
+                    NAME.pack_into(self.mem, self.offset(slot) + NAME_OFF, device.encode())
+                    HEADER.pack_into(self.mem, 0, slot + 1)
+                    self.index[device] = slot
+        return slot
+
+    @contextmanager
+    def locked(self):
+        # a worker killed while holding the lock never releases it; fail the
+        # write instead of hanging the request thread forever
+        if not self.lock.acquire(timeout=LOCK_TIMEOUT):
+            raise TimeoutError("shared fix table lock not released")
+        try:
+            yield
+        finally:
+            self.lock.release()
+
+    def write(self, device, lat, lon, t=None, speed=None):
+        slot = self.find(device, create=True)
+        off = self.offset(slot)
+        payload = PAYLOAD.pack(lat, lon, pack_json(t, TIME_SIZE), pack_json(speed, SPEED_SIZE))
+        with self.locked():
+            seq = SEQ.unpack_from(self.mem, off)[0] | 1  # already odd if a writer died mid-update
+            SEQ.pack_into(self.mem, off, seq)
+            self.mem[off + PAYLOAD_OFF:off + SLOT_SIZE] = payload
+            SEQ.pack_into(self.mem, off, seq + 1)
+        with self.changed:
+            self.changed.notify_all()
+        return (seq + 1) // 2
+
+    def version(self, device):
+        slot = self.find(device)
+        return 0 if slot is None else SEQ.unpack_from(self.mem, self.offset(slot))[0] // 2
+
+    def wait(self, device, version, timeout):
+        """Block until the device's fix version differs from `version`; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self.version(device) == version:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # writes from other worker processes cannot notify us, so re-check every 50 ms
+            with self.changed:
+                self.changed.wait(min(remaining, 0.05))
+        return True
+
+    def read(self, device):
+        """Consistent copy of a device's latest fix, or None if it never reported
+        (or its slot stayed mid-write for READ_TIMEOUT)."""
+        slot = self.find(device)
+        if slot is None:
+            return None
+        off = self.offset(slot)
+        deadline = None
+        while True:
+            seq = SEQ.unpack_from(self.mem, off)[0]
+            if seq & 1:
+                # writer mid-update, let it finish; bounded in case it died
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + READ_TIMEOUT
+                elif now > deadline:
+                    return None
+                time.sleep(0)
+                continue
+            payload = self.mem[off + PAYLOAD_OFF:off + SLOT_SIZE]
+            if SEQ.unpack_from(self.mem, off)[0] == seq:
+                break
+        if seq == 0:
+            return None
+        lat, lon, t, speed = PAYLOAD.unpack(payload)
+        return {
+            "lat": lat,
+            "lon": lon,
+            "time": json.loads(t.rstrip(b"\0")),
+            "speed": json.loads(speed.rstrip(b"\0")),
+            "version": seq // 2,
+        }
+
+    def devices(self):
+        self.refresh_index()
+        return list(self.index)
+
+    def read_all(self):
+        fixes = {device: self.read(device) for device in self.devices()}
+        return {device: fix for device, fix in fixes.items() if fix}
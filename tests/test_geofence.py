@@ -0,0 +1,92 @@
+import threading
+
+from geofence import MAX_CELLS_PER_FENCE, Fence, GeofenceEngine, ring_contains
+
+
+def square(x0, y0, x1, y1):
+    return [(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0)]
+
+
+def test_ring_contains():
+    ring = square(0, 0, 10, 10)
+    assert ring_contains(ring, 5, 5)
+    assert not ring_contains(ring, 15, 5)
+    assert not ring_contains(ring, 5, -1)
+
+
+def test_ring_contains_concave():
+    # a U shape: the notch between the arms is outside
+    ring = [(0, 0), (10, 0), (10, 10), (7, 10), (7, 3), (3, 3), (3, 10), (0, 10), (0, 0)]
+    assert ring_contains(ring, 1, 8)
+    assert ring_contains(ring, 9, 8)
+    assert not ring_contains(ring, 5, 8)
+
+
+def test_fence_with_hole():
+    fence = Fence("donut", "donut", [[square(0, 0, 10, 10), square(4, 4, 6, 6)]])
+    assert fence.contains(2, 2)
+    assert not fence.contains(5, 5)
+    assert not fence.contains(11, 5)
+
+
+def test_multipolygon_hole_does_not_cut_other_polygon():
+    fence = Fence("two", "two", [[square(0, 0, 10, 10), square(4, 4, 6, 6)], [square(4.5, 4.5, 5.5, 5.5)]])
+    assert fence.contains(5, 5)       # island inside the first polygon's hole
+    assert not fence.contains(4.2, 4.2)
+
+
+def test_grid_cells():
+    a = Fence("a", "a", [[square(0.1, 0.1, 0.9, 0.9)]])
+    b = Fence("b", "b", [[square(0.5, 0.5, 1.5, 1.5)]])
+    engine = GeofenceEngine([a, b], cell_size=1.0)
+    assert engine.cell_of(0.5, 0.5) == (0, 0)
+    assert engine.cell_of(-0.5, 1.5) == (-1, 1)
+    assert engine.grid[(0, 0)] == [a, b]
+    assert engine.grid[(1, 1)] == [b]
+    assert (2, 2) not in engine.grid
+    assert engine.containing(0.7, 0.7) == {"a", "b"}
+    assert engine.containing(1.2, 1.2) == {"b"}
+
+
+def test_large_fence_bypasses_grid():
+    big = Fence("big", "big", [[square(0, 0, 100, 100)]])
+    engine = GeofenceEngine([big], cell_size=1.0)
+    assert 101 * 101 > MAX_CELLS_PER_FENCE
+    assert engine.large == [big] and not engine.grid
+    assert engine.containing(50, 50) == {"big"}
+
+
+def test_enter_exit_events():
+    engine = GeofenceEngine([Fence("a", "a", [[square(0, 0, 1, 1)]])])
+    q = engine.subscribe()
+    assert [e["event"] for e in engine.evaluate("dev", 0.5, 0.5)] == ["enter"]
+    assert engine.evaluate("dev", 0.6, 0.6) == []
+    assert [e["event"] for e in engine.evaluate("dev", 2, 2)] == ["exit"]
+    assert [q.get_nowait()["event"] for _ in range(2)] == ["enter", "exit"]
+
+
+def test_events_carry_fence_name():
+    engine = GeofenceEngine([Fence("f1", "Home", [[square(0, 0, 1, 1)]])])
+    event, = engine.evaluate("dev", 0.5, 0.5)
+    assert (event["fence"], event["name"]) == ("f1", "Home")
+
+
+def test_concurrent_evaluations_publish_consistent_order():
+    engine = GeofenceEngine([Fence("a", "a", [[square(0, 0, 1, 1)]])])
+    q = engine.subscribe()
+    points = [(0.5, 0.5), (2, 2)] * 200  # stays below the queue limit
+
+    def worker(offset):
+        for lat, lon in points[offset::4]:
+            engine.evaluate("dev", lat, lon)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    kinds = []
+    while not q.empty():
+        kinds.append(q.get_nowait()["event"])
+    # transitions must alternate enter/exit, starting with enter
+    assert kinds == ["enter", "exit"] * (len(kinds) // 2) + ["enter"] * (len(kinds) % 2)
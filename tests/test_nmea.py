@@ -0,0 +1,78 @@
+from functools import reduce
+
+from nmea import NMEAParser, nmea_checksum
+
+
+def sentence(body):
+    return b"$%s*%02X\r\n" % (body, nmea_checksum(body))
+
+
+RMC = sentence(b"GPRMC,123519.00,A,4807.038,N,01131.000,E,022.4,084.4,230394,003.1,W")
+GGA = sentence(b"GPGGA,123519.00,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,")
+GGA_NEXT = sentence(b"GPGGA,123520.00,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,")
+RMC_NEXT = sentence(b"GPRMC,123520.00,A,4807.038,N,01131.000,E,030.0,084.4,230394,003.1,W")
+
+
+def test_checksum_matches_bytewise_xor():
+    for body in (b"", b"A", b"GPGGA", b"GPRMC,123519,A,4807.038,N,01131.000,E", bytes(range(1, 200))):
+        assert nmea_checksum(body) == reduce(lambda a, b: a ^ b, body, 0)
+
+
+def test_checksum_known_sentence():
+    assert nmea_checksum(b"GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,") == 0x47
+
+
+def test_rmc_fix():
+    fix, = NMEAParser().feed(RMC)
+    assert abs(fix["lat"] - (48 + 7.038 / 60)) < 1e-9
+    assert abs(fix["lon"] - (11 + 31.0 / 60)) < 1e-9
+    assert fix["time"] == "1994-03-23T12:35:19.00Z"
+    assert fix["speed"] == "11.52"
+
+
+def test_partial_reads_are_reassembled():
+    data = RMC + GGA + RMC_NEXT
+    whole = NMEAParser().feed(data)
+    parser = NMEAParser()
+    pieces = [parser.feed(data[i:i + 7]) for i in range(0, len(data), 7)]
+    assert [fix for piece in pieces for fix in piece] == whole
+    assert len(whole) == 2
+    assert not parser.buf
+
+
+def test_bad_checksum_is_rejected():
+    parser = NMEAParser()
+    corrupted = RMC.replace(b"4807.038", b"4807.039")
+    assert parser.feed(corrupted) == []
+    assert parser.bad_checksums == 1
+    assert len(parser.feed(RMC)) == 1
+
+
+def test_one_fix_per_epoch():
+    fixes = NMEAParser().feed(RMC + GGA + RMC_NEXT + GGA_NEXT)
+    assert [fix["time"] for fix in fixes] == ["1994-03-23T12:35:19.00Z", "1994-03-23T12:35:20.00Z"]
+
+
+def test_gga_before_rmc_uses_the_rmc_of_its_epoch():
+    fixes = NMEAParser().feed(GGA + RMC + GGA_NEXT + RMC_NEXT)
+    assert [(fix["time"], fix["speed"]) for fix in fixes] == [
+        ("1994-03-23T12:35:19.00Z", "11.52"), ("1994-03-23T12:35:20.00Z", "15.43")]
+
+
+def test_gga_only_is_released_by_the_next_epoch():
+    parser = NMEAParser()
+    assert parser.feed(GGA) == []
+    fix, = parser.feed(GGA_NEXT)
+    assert fix["time"] == "12:35:19.00" and fix["speed"] is None
+
+
+def test_gga_without_fix_quality_is_ignored():
+    no_fix = sentence(b"GPGGA,123519.00,4807.038,N,01131.000,E,0,00,,,M,,M,,")
+    assert NMEAParser().feed(no_fix) == []
+
+
+def test_overlong_garbage_is_discarded():
+    parser = NMEAParser()
+    parser.feed(b"x" * 1000)
+    assert not parser.buf
+    assert len(parser.feed(RMC)) == 1
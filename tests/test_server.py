@@ -0,0 +1,88 @@
+import gzip, json, threading, time
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("PyQt5")
+import aiov2
+from shared_state import SharedFixTable
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(aiov2, "fixes", SharedFixTable(slots=64))
+    return aiov2.app.test_client()
+
+
+def log(client, lat, lon, device="default"):
+    assert client.get("/log", query_string={"lat": lat, "lon": lon, "device": device}).status_code == 200
+
+
+def test_location_etag_and_304(client):
+    log(client, 1, 2)
+    r = client.get("/location")
+    assert r.status_code == 200 and r.json["lat"] == 1.0
+    tag = r.headers["ETag"]
+    assert tag.startswith('W/"') and tag.endswith('-1"')
+    r = client.get("/location", headers={"If-None-Match": tag})
+    assert r.status_code == 304 and r.data == b""
+    log(client, 3, 4)
+    assert client.get("/location", headers={"If-None-Match": tag}).status_code == 200
+
+
+def test_if_none_match_list_matches_current_version_only(client):
+    log(client, 1, 2)
+    first = client.get("/location").headers["ETag"]
+    log(client, 3, 4)
+    current = client.get("/location").headers["ETag"]
+    newer = current.replace('-2"', '-3"')
+    # a newer (unknown) tag in the list must not hide the current fix
+    assert client.get("/location", headers={"If-None-Match": f"{first}, {newer}"}).status_code == 200
+    assert client.get("/location", headers={"If-None-Match": f"{first}, {current}"}).status_code == 304
+
+
+def test_etag_from_another_run_does_not_match(client):
+    log(client, 1, 2)
+    assert client.get("/location", headers={"If-None-Match": 'W/"1"'}).status_code == 200
+    assert client.get("/location", headers={"If-None-Match": 'W/"00000000-1"'}).status_code == 200
+
+
+def test_wait_times_out_with_304(client):
+    log(client, 1, 2)
+    tag = client.get("/location").headers["ETag"]
+    start = time.monotonic()
+    r = client.get("/location?wait=0.3", headers={"If-None-Match": tag})
+    assert r.status_code == 304
+    assert time.monotonic() - start >= 0.3
+
+
+def test_wait_wakes_on_new_fix(client):
+    log(client, 1, 2)
+    tag = client.get("/location").headers["ETag"]
+    threading.Timer(0.2, aiov2.store_fix, args=(5.0, 6.0)).start()
+    start = time.monotonic()
+    r = client.get("/location?wait=10", headers={"If-None-Match": tag})
+    assert r.status_code == 200 and r.json["lat"] == 5.0
+    assert time.monotonic() - start < 2
+
+
+def test_msgpack_via_accept(client):
+    msgpack = pytest.importorskip("msgpack")
+    log(client, 1, 2)
+    r = client.get("/location", headers={"Accept": "application/msgpack"})
+    assert r.mimetype == "application/msgpack"
+    assert msgpack.unpackb(r.data)["lat"] == 1.0
+
+
+def test_devices_gzipped(client):
+    for i in range(20):
+        log(client, i, i, device=f"dev-{i}")
+    r = client.get("/devices", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(r.data))) == 20
+    assert "Content-Encoding" not in client.get("/devices").headers
+
+
+def test_log_rejects_oversized_fields(client):
+    assert client.get("/log", query_string={"lat": 1, "lon": 2, "device": "x" * 33}).status_code == 400
+    assert client.post("/log", json={"lat": 1, "lon": 2, "time": "x" * 1000}).status_code == 400
@@ -0,0 +1,106 @@
+import json, threading, time
+
+import pytest
+
+from shared_state import NAME, SharedFixTable, pack_json
+
+
+def test_read_unknown_device():
+    table = SharedFixTable(slots=4)
+    assert table.read("nobody") is None
+    assert table.version("nobody") == 0
+    assert table.read_all() == {}
+
+
+def test_write_read_and_versions():
+    table = SharedFixTable(slots=4)
+    assert table.write("a", 1.5, 2.5, "2024-01-01T00:00:00Z", "3.20") == 1
+    assert table.read("a") == {"lat": 1.5, "lon": 2.5, "time": "2024-01-01T00:00:00Z", "speed": "3.20", "version": 1}
+    assert table.write("a", 3.0, 4.0) == 2
+    assert table.write("b", 5.0, 6.0, 7, 8.5) == 1
+    assert table.version("a") == 2
+    assert table.read_all() == {
+        "a": {"lat": 3.0, "lon": 4.0, "time": None, "speed": None, "version": 2},
+        "b": {"lat": 5.0, "lon": 6.0, "time": 7, "speed": 8.5, "version": 1},
+    }
+
+
+def test_slot_exhaustion():
+    table = SharedFixTable(slots=2)
+    table.write("a", 0, 0)
+    table.write("b", 0, 0)
+    table.write("a", 1, 1)  # existing devices keep working
+    with pytest.raises(RuntimeError):
+        table.write("c", 0, 0)
+    assert table.devices() == ["a", "b"]
+
+
+def test_long_names_are_refused_not_truncated():
+    table = SharedFixTable(slots=4)
+    name = "x" * NAME.size
+    table.write(name, 1, 1)
+    assert table.read(name)["lat"] == 1
+    with pytest.raises(ValueError):
+        table.write(name + "A", 2, 2)
+    assert table.read(name + "A") is None
+
+
+def test_pack_json_truncates_to_slot():
+    assert pack_json("short", 48) == b'"short"'
+    for value in ("x" * 100_000, "é" * 100_000, '"' * 1000):
+        raw = pack_json(value, 48)
+        assert len(raw) <= 48
+        assert value.startswith(json.loads(raw))
+
+
+def test_wait_times_out():
+    table = SharedFixTable(slots=4)
+    table.write("a", 0, 0)
+    start = time.monotonic()
+    assert table.wait("a", 1, 0.2) is False
+    assert time.monotonic() - start >= 0.2
+
+
+def test_wait_returns_when_version_already_differs():
+    table = SharedFixTable(slots=4)
+    table.write("a", 0, 0)
+    assert table.wait("a", 0, 5) is True
+
+
+def test_wait_wakes_on_write():
+    table = SharedFixTable(slots=4)
+    table.write("a", 0, 0)
+    threading.Timer(0.1, table.write, args=("a", 1, 1)).start()
+    start = time.monotonic()
+    assert table.wait("a", 1, 5) is True
+    assert time.monotonic() - start < 1
+    assert table.read("a")["version"] == 2
+
+
+def test_concurrent_reads_are_never_torn():
+    # every write stores lat == lon == version; a torn read would mix them
+    table = SharedFixTable(slots=4)
+    table.write("a", 1, 1, 1, 1)
+    done = threading.Event()
+    bad = []
+
+    def writer():
+        for i in range(2, 5001):
+            table.write("a", i, i, i, i)
+        done.set()
+
+    def reader():
+        last = 0
+        while not done.is_set():
+            fix = table.read("a")
+            if not fix["lat"] == fix["lon"] == fix["time"] == fix["speed"] == fix["version"] or fix["version"] < last:
+                bad.append(fix)
+            last = fix["version"]
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert bad == []
+    assert table.read("a")["version"] == 5000
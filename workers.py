@@ -0,0 +1,30 @@
+import socket, multiprocessing
+from werkzeug.serving import make_server
+
+# --------------------- PRE-FORKED FLASK WORKERS ---------------------
+#
+# The parent binds the listening socket once and forks the workers; each
+# worker runs its own threaded werkzeug server on the inherited socket and
+# the kernel spreads incoming connections across them. State that must be
+# the same in every worker lives in shared_state.SharedFixTable. POSIX only.
+# Workers are not re-forked when they die: by then the parent runs Qt and
+# other threads, and forking a threaded process is unsafe. The survivors
+# keep serving the shared socket.
+
+
+def run_worker(app, host, port, fd):
+    server = make_server(host, port, app, threaded=True, fd=fd)
+    server.serve_forever()
+
+
+def serve_workers(app, workers, host="0.0.0.0", port=5000):
+    sock = socket.create_server((host, port), backlog=512)
+    sock.set_inheritable(True)
+    ctx = multiprocessing.get_context("fork")
+    procs = []
+    for _ in range(workers):
+        p = ctx.Process(target=run_worker, args=(app, host, port, sock.fileno()), daemon=True)
+        p.start()
+        procs.append(p)
+    print(f"🧵 {workers} workers serving on {host}:{port} (pids {[p.pid for p in procs]})")
+    return procs